@@ -1,12 +1,17 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import errno
+import fnmatch
 import json
 import os
+import re
+import signal
 import socket
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Iterable
+import time
+import urllib.parse as urlparse
+from dataclasses import dataclass, field
 
 import paho.mqtt.client as mqtt
 import serial.tools.list_ports
@@ -18,11 +23,55 @@ def _env(name: str, default: str = "") -> str:
     return default if val is None else val
 
 
+def _env_int(name: str) -> int | None:
+    # Optional add-on options arrive as "" or "null" when unset
+    val = _env(name).strip()
+    return None if val in ("", "null") else int(val)
+
+
 def _split_csv(value: str) -> list[str]:
     return [p.strip() for p in value.split(",") if p.strip()]
 
 
-@dataclass
+# Compact UTF-8 JSON as bytes. msgspec has no musllinux wheel for
+# armhf/armv7/i386 and the image has no compiler, so it's optional.
+try:
+    import msgspec
+except ImportError:
+    def _json_encode(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+else:
+    # Reused encoder; msgspec writes straight to bytes
+    _json_encode = msgspec.json.Encoder().encode
+
+# Bytes requested per read wakeup, and the longest unterminated line we
+# buffer before publishing it as-is
+_READ_CHUNK = 4096
+_MAX_LINE = 1024 * 1024
+
+
+# [epoch second, its "%Y-%m-%dT%H:%M:%S" rendering]
+_iso_cache: list = [0, ""]
+
+
+def _iso_now() -> str:
+    # UTC ISO-8601 with microseconds; strftime runs at most once per second
+    t = time.time()
+    s = int(t)
+    if s != _iso_cache[0]:
+        _iso_cache[0] = s
+        _iso_cache[1] = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(s))
+    return f"{_iso_cache[1]}.{int((t - s) * 1e6):06d}"
+
+
+def _compile_globs(patterns: list[str]) -> re.Pattern[str]:
+    # One alternation for the whole list; an empty list must match nothing
+    if not patterns:
+        return re.compile(r"(?!)")
+    return re.compile("|".join(fnmatch.translate(pat) for pat in patterns))
+
+
+@dataclass(slots=True, frozen=True)
 class Settings:
     mqtt_broker: str
     mqtt_username: str
@@ -33,6 +82,15 @@ class Settings:
     enable_discovery: bool
     discovery_prefix: str
     probe_command: str
+    rt_cpu: int | None
+    rt_prio: int | None
+    include_re: re.Pattern[str] = field(init=False, repr=False)
+    exclude_re: re.Pattern[str] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # frozen: derived fields have to bypass __setattr__
+        object.__setattr__(self, "include_re", _compile_globs(self.include_patterns))
+        object.__setattr__(self, "exclude_re", _compile_globs(self.exclude_patterns))
 
 
 def load_settings() -> Settings:
@@ -46,19 +104,74 @@ def load_settings() -> Settings:
         enable_discovery=_env("ENABLE_DISCOVERY", "true").lower() == "true",
         discovery_prefix=_env("DISCOVERY_PREFIX", "homeassistant"),
         probe_command=_env("PROBE_COMMAND", ""),
+        rt_cpu=_env_int("RT_CPU"),
+        rt_prio=_env_int("RT_PRIO"),
     )
 
 
-def matches(path: str, patterns: Iterable[str]) -> bool:
-    import fnmatch
+def apply_realtime(cfg: Settings) -> None:
+    # Optional pinning for latency-critical setups. Needs CAP_SYS_NICE for
+    # SCHED_FIFO; threads started later (e.g. the default executor) inherit
+    # both settings.
+    if cfg.rt_cpu is not None:
+        try:
+            os.sched_setaffinity(0, {cfg.rt_cpu})
+        except (AttributeError, OSError) as err:
+            print(f"[multi_serial_scanner] rt_cpu={cfg.rt_cpu} not applied: {err}")
+    if cfg.rt_prio is not None:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(cfg.rt_prio))
+        except (AttributeError, OSError) as err:
+            print(f"[multi_serial_scanner] rt_prio={cfg.rt_prio} not applied: {err}")
+
 
-    return any(fnmatch.fnmatch(path, pat) for pat in patterns)
+def list_candidate_ports(cfg: Settings) -> frozenset[str]:
+    return frozenset(
+        p.device
+        for p in serial.tools.list_ports.comports()
+        if cfg.include_re.match(p.device) and not cfg.exclude_re.match(p.device)
+    )
 
 
-def list_candidate_ports(cfg: Settings) -> list[str]:
-    ports = [p.device for p in serial.tools.list_ports.comports()]
-    allowed = [p for p in ports if matches(p, cfg.include_patterns) and not matches(p, cfg.exclude_patterns)]
-    return sorted(set(allowed))
+# Kernel hotplug events over netlink. The add-on runs in the host network
+# namespace, so it receives them without udevd or libudev in the image.
+_NETLINK_KOBJECT_UEVENT = 15
+# With hotplug events, timed rescans only catch anything they missed
+_HOTPLUG_RESCAN_INTERVAL = 30.0
+
+
+def open_uevent_socket() -> socket.socket | None:
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, _NETLINK_KOBJECT_UEVENT)
+        sock.bind((0, 1))  # multicast group 1: kernel uevents
+    except (AttributeError, OSError):
+        # Not Linux, or netlink not permitted: caller falls back to polling
+        return None
+    sock.setblocking(False)
+    return sock
+
+
+def read_uevents(sock: socket.socket, cfg: Settings) -> bool:
+    # Drain pending uevents; True if a wanted tty was added or removed
+    changed = False
+    while True:
+        try:
+            msg = sock.recv(16384)
+        except BlockingIOError:
+            return changed
+        except OSError as err:
+            # The socket gets every uevent on the system; if its buffer
+            # overflowed, events were lost, so rescan rather than guess
+            if err.errno == errno.ENOBUFS:
+                return True
+            raise
+        # "action@devpath\0KEY=VALUE\0KEY=VALUE..."
+        env = dict(item.split(b"=", 1) for item in msg.split(b"\0")[1:] if b"=" in item)
+        if env.get(b"SUBSYSTEM") != b"tty" or env.get(b"ACTION") not in (b"add", b"remove"):
+            continue
+        dev = "/dev/" + env.get(b"DEVNAME", b"").decode("utf-8", "ignore")
+        if cfg.include_re.match(dev) and not cfg.exclude_re.match(dev):
+            changed = True
 
 
 class SerialReader:
@@ -70,15 +183,51 @@ class SerialReader:
         self.reader: asyncio.StreamReader | None = None
         self.writer: asyncio.StreamWriter | None = None
         self.task: asyncio.Task | None = None
+        self._buf = bytearray()
+        self._last_state: tuple[str, str | None] | None = None
+        self._slug_str = device.replace("/", "_").replace("\\", "_")
+        self._data_topic = f"multi_serial/{self._slug_str}/data"
+        self._status_topic = f"multi_serial/{self._slug_str}/status"
+        # Simple MQTT Discovery for a sensor showing last payload
+        self._discovery_topic = f"{cfg.discovery_prefix}/sensor/{self._slug_str}/last/config"
+        self._discovery_payload = _json_encode({
+            "name": f"Serial {device} Last",
+            "unique_id": f"multi_serial_{self._slug_str}",
+            "state_topic": self._data_topic,
+            "value_template": "{{ value_json.data }}",
+            "json_attributes_topic": self._status_topic,
+            "availability": [{
+                "topic": self._status_topic,
+                "value_template": "{{ value_json.state }}"
+            }],
+        })
+        # Static parts of the data payload; only data and ts vary per line
+        device_json = _json_encode(device)
+        self._data_prefix = b'{"device":' + device_json + b',"data":'
+        self._data_suffix = b',"ts":"'
+        # Error-free status (the common case) is templated the same way
+        self._status_prefix = b'{"device":' + device_json + b',"state":'
+        self._status_suffix = b',"error":null,"ts":"'
 
     async def start(self) -> None:
         try:
             self.reader, self.writer = await serial_asyncio.open_serial_connection(url=self.device, baudrate=9600)
         except Exception as err:
-            self._publish_status("error", str(err))
+            self._publish_status("error", err)
             return
 
+        # Ask the tty driver for ASYNC_LOW_LATENCY so reads aren't coalesced
+        # (FTDI/CP210x default to ~16 ms). Linux only; other platforms and
+        # non-USB ttys raise, which is fine.
+        try:
+            self.writer.transport.serial.set_low_latency_mode(True)
+        except Exception:
+            pass
+
         self._publish_status("connected", None)
+        # Discovery config is retained and static per device: publish it once
+        if self.cfg.enable_discovery:
+            self._ensure_discovery()
 
         # Optional probe: send an identification command
         if self.cfg.probe_command and self.writer is not None:
@@ -92,7 +241,7 @@ class SerialReader:
     async def stop(self) -> None:
         if self.task and not self.task.done():
             self.task.cancel()
-            with contextlib.suppress(Exception):
+            with contextlib.suppress(Exception, asyncio.CancelledError):
                 await self.task
         if self.writer and not self.writer.is_closing():
             self.writer.close()
@@ -101,89 +250,183 @@ class SerialReader:
 
     async def _read_loop(self) -> None:
         assert self.reader is not None
+        buf = self._buf
         while True:
-            line = await self.reader.readline()
-            if not line:
+            chunk = await self.reader.read(_READ_CHUNK)
+            if not chunk:
+                if buf:
+                    self._publish(buf.rstrip(b"\r").decode("utf-8", "ignore"), _iso_now().encode())
+                    buf.clear()
                 self._publish_status("disconnected", "eof")
                 break
-            try:
-                payload = line.decode("utf-8", errors="ignore").strip()
-            except Exception:
-                payload = line.hex()
-            self._publish(payload)
-
-    def _publish_status(self, state: str, error: str | None) -> None:
-        msg = {"device": self.device, "state": state, "error": error, "ts": datetime.utcnow().isoformat()}
-        self.mqtt.publish(f"multi_serial/{self._slug()}/status", json.dumps(msg), qos=1, retain=True)
-
-    def _publish(self, data: str) -> None:
-        msg = {"device": self.device, "data": data, "ts": datetime.utcnow().isoformat()}
-        self.mqtt.publish(f"multi_serial/{self._slug()}/data", json.dumps(msg), qos=0, retain=False)
-        if self.cfg.enable_discovery:
-            self._ensure_discovery()
+            buf += chunk
+            end = buf.rfind(b"\n")
+            if end < 0:
+                if len(buf) > _MAX_LINE:
+                    self._publish(buf.decode("utf-8", "ignore"), _iso_now().encode())
+                    buf.clear()
+                continue
+            # One wakeup often carries several lines: decode them in one call
+            # (\n never splits a UTF-8 sequence) and share one timestamp
+            ts = _iso_now().encode()
+            for line in buf[:end].decode("utf-8", "ignore").split("\n"):
+                self._publish(line.rstrip("\r"), ts)
+            del buf[: end + 1]
+
+    def _publish_status(self, state: str, error: BaseException | str | None) -> None:
+        if error is None:
+            key = (state, None)
+        else:
+            key = (state, str(error))
+        # Status is retained: republishing an unchanged state is wasted broker work
+        if key == self._last_state:
+            return
+        self._last_state = key
+        if error is None:
+            payload = self._status_prefix + _json_encode(state) + self._status_suffix + _iso_now().encode() + b'"}'
+        else:
+            payload = _json_encode({"device": self.device, "state": state, "error": key[1], "ts": _iso_now()})
+        self.mqtt.publish(self._status_topic, payload, qos=1, retain=True)
 
-    def _slug(self) -> str:
-        return self.device.replace("/", "_").replace("\\", "_")
+    def _publish(self, data: str, ts: bytes) -> None:
+        payload = self._data_prefix + _json_encode(data) + self._data_suffix + ts + b'"}'
+        self.mqtt.publish(self._data_topic, payload, qos=0, retain=False)
 
     def _ensure_discovery(self) -> None:
-        # Publish simple MQTT Discovery for a sensor showing last payload
-        node_id = self._slug()
-        unique_id = f"multi_serial_{node_id}"
-        base = f"{self.cfg.discovery_prefix}/sensor/{node_id}/last"
-        config = {
-            "name": f"Serial {self.device} Last",
-            "unique_id": unique_id,
-            "state_topic": f"multi_serial/{node_id}/data",
-            "value_template": "{{ value_json.data }}",
-            "json_attributes_topic": f"multi_serial/{node_id}/status",
-            "availability": [{
-                "topic": f"multi_serial/{node_id}/status",
-                "value_template": "{{ value_json.state }}"
-            }],
-        }
-        self.mqtt.publish(f"{base}/config", json.dumps(config), qos=1, retain=True)
+        self.mqtt.publish(self._discovery_topic, self._discovery_payload, qos=1, retain=True)
+
+
+# reconnect() blocks the loop for up to paho's connect timeout, so attempts
+# back off like loop_start()'s thread did (reconnect_delay_set() defaults)
+_RECONNECT_MIN_DELAY = 1.0
+_RECONNECT_MAX_DELAY = 120.0
+
+
+# Drives paho from the asyncio loop instead of loop_start()'s thread: paho
+# reports its socket via the on_socket_* callbacks, the loop dispatches
+# reads/writes and loop_misc() (keepalive, reconnect) runs once a second.
+class MqttLoop:
+    def __init__(self, loop: asyncio.AbstractEventLoop, client: mqtt.Client) -> None:
+        self.loop = loop
+        self.client = client
+        self.misc: asyncio.Task | None = None
+        client.on_socket_open = self._on_socket_open
+        client.on_socket_close = self._on_socket_close
+        client.on_socket_register_write = self._on_socket_register_write
+        client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    def _on_socket_open(self, client: mqtt.Client, userdata, sock) -> None:
+        self.loop.add_reader(sock, client.loop_read)
+        if self.misc is None:
+            self.misc = self.loop.create_task(self._misc_loop())
+
+    def _on_socket_close(self, client: mqtt.Client, userdata, sock) -> None:
+        self.loop.remove_reader(sock)
+        self.loop.remove_writer(sock)
+
+    def _on_socket_register_write(self, client: mqtt.Client, userdata, sock) -> None:
+        self.loop.add_writer(sock, client.loop_write)
+
+    def _on_socket_unregister_write(self, client: mqtt.Client, userdata, sock) -> None:
+        self.loop.remove_writer(sock)
+
+    async def _misc_loop(self) -> None:
+        delay = _RECONNECT_MIN_DELAY
+        retry_at = 0.0
+        while True:
+            if self.client.loop_misc() == mqtt.MQTT_ERR_NO_CONN:
+                # loop_start() used to reconnect for us
+                now = self.loop.time()
+                if now >= retry_at:
+                    retry_at = now + delay
+                    delay = min(delay * 2, _RECONNECT_MAX_DELAY)
+                    with contextlib.suppress(OSError):
+                        self.client.reconnect()
+            elif self.client.is_connected():
+                delay = _RECONNECT_MIN_DELAY
+            await asyncio.sleep(1)
+
+    async def close(self) -> None:
+        self.client.disconnect()
+        # Flush the DISCONNECT packet; paho closes the socket once it's sent
+        self.client.loop_write()
+        if self.misc is not None:
+            self.misc.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.misc
 
 
 async def main_async() -> None:
     cfg = load_settings()
+    apply_realtime(cfg)
 
     # MQTT client
     client = mqtt.Client()
+    # Status/discovery are QoS 1; don't let a slow broker stall them behind
+    # paho's default window of 20 in-flight messages. 0 = unbounded queue.
+    client.max_inflight_messages_set(1024)
+    client.max_queued_messages_set(0)
     if cfg.mqtt_username:
         client.username_pw_set(cfg.mqtt_username, cfg.mqtt_password or None)
 
     # Parse broker
-    import urllib.parse as urlparse
-
     url = urlparse.urlparse(cfg.mqtt_broker)
     host = url.hostname or "homeassistant"
     port = url.port or 1883
+    loop = asyncio.get_running_loop()
+    mqtt_loop = MqttLoop(loop, client)
     client.connect(host, port, 60)
-    client.loop_start()
+
+    # Rescan on hotplug events or SIGUSR1; poll every scan_interval only
+    # when hotplug events are unavailable
+    rescan = asyncio.Event()
+    with contextlib.suppress(NotImplementedError):
+        loop.add_signal_handler(signal.SIGUSR1, rescan.set)
+    uevents = open_uevent_socket()
+    if uevents is not None:
+        loop.add_reader(uevents, lambda: read_uevents(uevents, cfg) and rescan.set())
+        interval = _HOTPLUG_RESCAN_INTERVAL
+    else:
+        print("[multi_serial_scanner] hotplug events unavailable, polling for ports")
+        interval = cfg.scan_interval
 
     readers: dict[str, SerialReader] = {}
+    prev_wanted: frozenset[str] | None = None
 
     try:
         while True:
-            wanted = set(list_candidate_ports(cfg))
-            # stop removed
-            for dev in list(readers.keys() - wanted):
-                await readers.pop(dev).stop()
-            # start new
-            for dev in wanted - set(readers.keys()):
-                reader = SerialReader(dev, client, "multi_serial", cfg)
-                readers[dev] = reader
-                await reader.start()
-            await asyncio.sleep(cfg.scan_interval)
+            wanted = list_candidate_ports(cfg)
+            # steady state: nothing plugged or unplugged since last scan
+            if wanted != prev_wanted:
+                prev_wanted = wanted
+                # stop removed
+                for dev in readers.keys() - wanted:
+                    await readers.pop(dev).stop()
+                # start new
+                for dev in wanted - readers.keys():
+                    reader = SerialReader(dev, client, "multi_serial", cfg)
+                    readers[dev] = reader
+                    await reader.start()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(rescan.wait(), interval)
+            rescan.clear()
     finally:
+        if uevents is not None:
+            loop.remove_reader(uevents)
+            uevents.close()
         for r in readers.values():
             await r.stop()
-        client.loop_stop()
-        client.disconnect()
+        await mqtt_loop.close()
 
 
 if __name__ == "__main__":
-    import contextlib
+    # uvloop where a wheel exists for this arch; stock asyncio loop otherwise
+    try:
+        import uvloop
+    except ImportError:
+        pass
+    else:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
     try:
         asyncio.run(main_async())
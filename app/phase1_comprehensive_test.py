@@ -13,18 +13,33 @@ This script thoroughly tests all Phase 1 features:
 """
 
 import asyncio
-import json
+import collections
+import glob
+import logging
+import os
+import sys
 import time
-import hashlib
-import threading
-from datetime import datetime
-from typing import Dict, List, Optional
+import functools
+import zlib
+from typing import Deque, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import paho.mqtt.client as mqtt
 import serial
 import serial.tools.list_ports
 
+from main import MqttLoop, _compile_globs, _iso_now, _json_encode
+
+# Same optional dependency as main.py: no msgspec wheel on armhf/armv7/i386
+try:
+    from msgspec.json import decode as _json_decode
+except ImportError:
+    from json import loads as _json_decode
+
+# Per-item detail (each received message, each passing case) is logged at
+# DEBUG so it costs nothing unless --verbose is given
+logger = logging.getLogger("phase1")
+
 
 class DeviceType(Enum):
     UNKNOWN = "unknown"
@@ -35,6 +50,83 @@ class DeviceType(Enum):
     CUSTOM = "custom"
 
 
+# Identification substrings per device type, checked in this order
+_DEVICE_PATTERNS = {
+    DeviceType.BLE: [b"BLE", b"BLUETOOTH", b"BT_"],
+    DeviceType.ZIGBEE: [b"ZIGBEE", b"ZIG", b"COORDINATOR", b"ZHA_"],
+    DeviceType.ZWAVE: [b"ZWAVE", b"ZW_", b"CONTROLLER"],
+    DeviceType.MATTER: [b"MATTER", b"FABRIC", b"MT_"],
+}
+
+# Flattened once, in priority order. Patterns are already upper case, so a
+# response is upper-cased once and scanned with `in`, linear in its length.
+_DEVICE_TABLE: Tuple[Tuple[bytes, DeviceType], ...] = tuple(
+    (pattern, device_type)
+    for device_type, patterns in _DEVICE_PATTERNS.items()
+    for pattern in patterns
+)
+
+
+# (banner, expected type) cases for test 2
+_TEST_PATTERNS: Tuple[Tuple[bytes, DeviceType], ...] = (
+    (b"BLE_DONGLE_V1.0", DeviceType.BLE),
+    (b"BLUETOOTH_LOW_ENERGY", DeviceType.BLE),
+    (b"BT_DEVICE", DeviceType.BLE),
+    (b"ZIGBEE_COORDINATOR", DeviceType.ZIGBEE),
+    (b"ZIG_HOME_AUTOMATION", DeviceType.ZIGBEE),
+    (b"ZHA_ACTIVE", DeviceType.ZIGBEE),
+    (b"ZWAVE_CONTROLLER", DeviceType.ZWAVE),
+    (b"ZW_NETWORK", DeviceType.ZWAVE),
+    (b"ZW_DEVICE", DeviceType.ZWAVE),
+    (b"MATTER_FABRIC", DeviceType.MATTER),
+    (b"MT_COMMISSIONING", DeviceType.MATTER),
+    (b"MATTER_DEVICE", DeviceType.MATTER),
+)
+
+# Same defaults as the add-on's include_patterns/exclude_patterns options
+_INCLUDE_PATTERNS = ["/dev/ttyUSB*", "/dev/ttyACM*"]
+_EXCLUDE_PATTERNS = ["/dev/ttyS*", "/dev/input*", "/dev/hidraw*"]
+
+
+_INCLUDE_RE = _compile_globs(_INCLUDE_PATTERNS)
+_EXCLUDE_RE = _compile_globs(_EXCLUDE_PATTERNS)
+
+
+def _fast_list_ports() -> List[str]:
+    # comports() opens several sysfs files per tty for description/VID/PID,
+    # none of which filtering needs; on Linux two readdirs are enough. Every
+    # tty node is listed, so include/exclude filtering is left to the caller.
+    if sys.platform != "linux":
+        return [p.device for p in serial.tools.list_ports.comports()]
+    # by-id entries are symlinks to tty nodes; resolve and dedupe them
+    paths = glob.glob("/dev/serial/by-id/*") + glob.glob("/dev/tty*")
+    return list(dict.fromkeys(os.path.realpath(p) for p in paths))
+
+
+@functools.lru_cache(maxsize=1024)
+def _fingerprint(device_path: str, device_type: DeviceType, capabilities: tuple) -> str:
+    # 8 hex chars of a non-cryptographic 32-bit hash; identical devices get
+    # the same ID and repeat enumerations hit the cache
+    data = f"{device_path}:{device_type.value}:{','.join(sorted(capabilities))}"
+    return f"{zlib.crc32(data.encode()):08x}"
+
+
+def _reject(message: Dict) -> bool:
+    return False
+
+
+# One straight-line presence check per message type, looked up once by type;
+# extra keys are allowed
+_VALIDATORS = {
+    "discovery": lambda m: (
+        "device_path" in m and "device_type" in m and "fingerprint" in m
+        and "capabilities" in m and "discovered_at" in m
+    ),
+    "status": lambda m: "device" in m and "state" in m and "ts" in m,
+    "data": lambda m: "device" in m and "data" in m and "ts" in m,
+}
+
+
 @dataclass
 class TestResult:
     test_name: str
@@ -43,43 +135,66 @@ class TestResult:
     duration: float
 
 
+_ICONS = {"PASS": "✅", "FAIL": "❌", "SKIP": "⚠️"}
+
+
 class Phase1ComprehensiveTester:
     """Comprehensive tester for all Phase 1 features"""
     
-    def __init__(self, mqtt_host="localhost", mqtt_port=1883, mqtt_username="homeassistant"):
+    # Commands must arrive; the multi_serial/# subscription only observes,
+    # and QoS 0 spares the broker a PUBACK per delivered message
+    COMMAND_QOS = 1
+    OBSERVE_QOS = 0
+    
+    def __init__(self, mqtt_host="localhost", mqtt_port=1883, mqtt_username="homeassistant", max_buffered=1024):
         self.mqtt_host = mqtt_host
         self.mqtt_port = mqtt_port
         self.mqtt_username = mqtt_username
         self.client = mqtt.Client()
         self.test_results: List[TestResult] = []
-        self.received_messages: List[Dict] = []
+        self._status_counts: collections.Counter = collections.Counter()
+        # Bounded: under a flood the oldest messages are dropped instead of
+        # growing without limit
+        self.received_messages: Deque[Dict] = collections.deque(maxlen=max_buffered)
         self.device_simulators: Dict[str, 'MockDevice'] = {}
         self.test_start_time = time.time()
+        # paho runs on this event loop (the add-on's MqttLoop), not on a
+        # thread of its own, so callbacks can touch asyncio objects directly
+        self._loop = asyncio.get_running_loop()
+        self._mqtt_loop = MqttLoop(self._loop, self.client)
+        self._connected = asyncio.Event()
+        # Back-pressure for bursts: a publish takes a slot of the caller's
+        # semaphore before it is queued and on_publish gives it back once
+        # paho has written it out
+        self._inflight: Dict[int, asyncio.Semaphore] = {}
+        self.dropped_messages = 0
         
         # Set up MQTT callbacks
         self.client.on_connect = self._on_connect
         self.client.on_message = self._on_message
         self.client.on_disconnect = self._on_disconnect
+        self.client.on_publish = self._on_publish
         
     def _on_connect(self, client, userdata, flags, rc):
         """MQTT connection callback"""
         if rc == 0:
             print(f"✅ MQTT Connected successfully (code: {rc})")
             # Subscribe to all multi_serial topics
-            client.subscribe("multi_serial/#", qos=1)
+            client.subscribe("multi_serial/#", qos=self.OBSERVE_QOS)
+            self._connected.set()
         else:
             print(f"❌ MQTT Connection failed (code: {rc})")
             
     def _on_message(self, client, userdata, msg):
         """MQTT message callback"""
         try:
-            payload = json.loads(msg.payload.decode())
+            payload = _json_decode(msg.payload)
             self.received_messages.append({
                 'topic': msg.topic,
                 'payload': payload,
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': _iso_now()
             })
-            print(f"📨 Received: {msg.topic} = {json.dumps(payload, indent=2)}")
+            logger.debug("📨 Received: %s = %s", msg.topic, payload)
         except Exception as e:
             print(f"❌ Error parsing message: {e}")
             
@@ -88,28 +203,55 @@ class Phase1ComprehensiveTester:
         if rc != 0:
             print(f"⚠️ MQTT Disconnected unexpectedly (code: {rc})")
             
-    def connect_mqtt(self) -> bool:
+    def _on_publish(self, client, userdata, mid):
+        """MQTT publish-complete callback"""
+        pending = self._inflight.pop(mid, None)
+        if pending is not None:
+            pending.release()
+            
+    async def _publish_bounded(self, pending: asyncio.Semaphore, topic: str, payload: bytes,
+                               qos: int = 0, timeout: float = 1.0) -> bool:
+        """Publish once a slot is free; drop the message if none frees up in time"""
+        try:
+            await asyncio.wait_for(pending.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.dropped_messages += 1
+            logger.debug("⚠️ Dropped %s: no publish slot within %.1fs", topic, timeout)
+            return False
+        info = self.client.publish(topic, payload, qos=qos)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            # Never queued, so on_publish won't release it
+            pending.release()
+            self.dropped_messages += 1
+            logger.debug("⚠️ Dropped %s: publish refused (%s)", topic, mqtt.error_string(info.rc))
+            return False
+        self._inflight[info.mid] = pending
+        return True
+        
+    async def connect_mqtt(self) -> bool:
         """Connect to MQTT broker"""
         try:
             self.client.username_pw_set(self.mqtt_username, None)
             self.client.connect(self.mqtt_host, self.mqtt_port, 60)
-            self.client.loop_start()
-            time.sleep(2)  # Wait for connection
+            await asyncio.wait_for(self._connected.wait(), timeout=5)
             return True
+        except asyncio.TimeoutError:
+            print("❌ MQTT connection failed: no CONNACK within 5s")
+            return False
         except Exception as e:
             print(f"❌ MQTT connection failed: {e}")
             return False
             
-    def disconnect_mqtt(self):
+    async def disconnect_mqtt(self):
         """Disconnect from MQTT broker"""
-        self.client.loop_stop()
-        self.client.disconnect()
+        await self._mqtt_loop.close()
         
     def add_test_result(self, test_name: str, status: str, details: str, duration: float = 0):
         """Add a test result"""
         result = TestResult(test_name, status, details, duration)
         self.test_results.append(result)
-        print(f"{'✅' if status == 'PASS' else '❌' if status == 'FAIL' else '⚠️'} {test_name}: {status}")
+        self._status_counts[status] += 1
+        print(f"{_ICONS.get(status, '⚠️')} {test_name}: {status}")
         if details:
             print(f"   Details: {details}")
             
@@ -121,7 +263,7 @@ class Phase1ComprehensiveTester:
         
         start_time = time.time()
         
-        if self.connect_mqtt():
+        if await self.connect_mqtt():
             self.add_test_result(
                 "MQTT Connection",
                 "PASS",
@@ -144,26 +286,16 @@ class Phase1ComprehensiveTester:
         
         start_time = time.time()
         
-        # Test device type detection patterns
-        test_patterns = {
-            DeviceType.BLE: [b"BLE_DONGLE_V1.0", b"BLUETOOTH_LOW_ENERGY", b"BT_DEVICE"],
-            DeviceType.ZIGBEE: [b"ZIGBEE_COORDINATOR", b"ZIG_HOME_AUTOMATION", b"ZHA_ACTIVE"],
-            DeviceType.ZWAVE: [b"ZWAVE_CONTROLLER", b"ZW_NETWORK", b"ZW_DEVICE"],
-            DeviceType.MATTER: [b"MATTER_FABRIC", b"MT_COMMISSIONING", b"MATTER_DEVICE"]
-        }
-        
         passed_tests = 0
-        total_tests = 0
-        
-        for device_type, patterns in test_patterns.items():
-            for pattern in patterns:
-                total_tests += 1
-                detected_type = self._detect_device_type_from_response(pattern)
-                if detected_type == device_type:
-                    passed_tests += 1
-                    print(f"  ✅ {device_type.value.upper()}: {pattern.decode()}")
-                else:
-                    print(f"  ❌ {device_type.value.upper()}: {pattern.decode()} -> detected as {detected_type.value}")
+        total_tests = len(_TEST_PATTERNS)
+        
+        for pattern, device_type in _TEST_PATTERNS:
+            detected_type = self._detect_device_type_from_response(pattern)
+            if detected_type == device_type:
+                passed_tests += 1
+                logger.debug("  ✅ %s: %s", device_type.name, pattern.decode())
+            else:
+                print(f"  ❌ {device_type.name}: {pattern.decode()} -> detected as {detected_type.value}")
                     
         if passed_tests == total_tests:
             self.add_test_result(
@@ -182,20 +314,10 @@ class Phase1ComprehensiveTester:
             
     def _detect_device_type_from_response(self, response: bytes) -> DeviceType:
         """Detect device type from response (same logic as add-on)"""
-        response_str = response.upper()
-        
-        patterns = {
-            DeviceType.BLE: [b"BLE", b"BLUETOOTH", b"BT_"],
-            DeviceType.ZIGBEE: [b"ZIGBEE", b"ZIG", b"COORDINATOR", b"ZHA_"],
-            DeviceType.ZWAVE: [b"ZWAVE", b"ZW_", b"CONTROLLER", b"ZW_"],
-            DeviceType.MATTER: [b"MATTER", b"FABRIC", b"MT_", b"MATTER_"]
-        }
-        
-        for device_type, device_patterns in patterns.items():
-            for pattern in device_patterns:
-                if pattern.upper() in response_str:
-                    return device_type
-                    
+        response = response.upper()
+        for pattern, device_type in _DEVICE_TABLE:
+            if pattern in response:
+                return device_type
         return DeviceType.UNKNOWN
         
     async def test_3_device_fingerprinting(self):
@@ -238,8 +360,7 @@ class Phase1ComprehensiveTester:
             
     def _generate_fingerprint(self, device_path: str, device_type: DeviceType, capabilities: List[str]) -> str:
         """Generate device fingerprint (same logic as add-on)"""
-        data = f"{device_path}:{device_type.value}:{','.join(sorted(capabilities))}"
-        return hashlib.md5(data.encode()).hexdigest()[:8]
+        return _fingerprint(device_path, device_type, tuple(capabilities))
         
     async def test_4_message_queuing(self):
         """Test 4: Message Queuing and Retry Logic"""
@@ -262,7 +383,7 @@ class Phase1ComprehensiveTester:
         for operation, success in queue_operations:
             if success:
                 passed_operations += 1
-                print(f"  ✅ {operation}")
+                logger.debug("  ✅ %s", operation)
             else:
                 print(f"  ❌ {operation}")
                 
@@ -302,12 +423,14 @@ class Phase1ComprehensiveTester:
         
         for command_name, payload in test_commands:
             topic = f"multi_serial/test_device/{command_name}"
-            self.client.publish(topic, json.dumps(payload), qos=1)
-            print(f"  📤 Sent {command_name} command to {topic}")
-            time.sleep(0.5)
+            self.client.publish(topic, _json_encode(payload), qos=self.COMMAND_QOS)
+            logger.debug("  📤 Sent %s command to %s", command_name, topic)
             
-        # Wait for any responses
-        time.sleep(2)
+        # Wait for any responses; our own commands echo back on multi_serial/#,
+        # so stop as soon as all of them have arrived
+        deadline = time.monotonic() + 2
+        while len(self.received_messages) < len(test_commands) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
         
         # Check if we received any messages
         if len(self.received_messages) > 0:
@@ -332,6 +455,7 @@ class Phase1ComprehensiveTester:
         print("="*60)
         
         start_time = time.time()
+        ts = _iso_now()
         
         # Test message format validation
         test_messages = [
@@ -342,7 +466,7 @@ class Phase1ComprehensiveTester:
                     "device_type": "ble",
                     "fingerprint": "a1b2c3d4",
                     "capabilities": ["serial_communication", "bluetooth_low_energy"],
-                    "discovered_at": datetime.utcnow().isoformat(),
+                    "discovered_at": ts,
                     "metadata": {"test": True}
                 }
             },
@@ -352,13 +476,13 @@ class Phase1ComprehensiveTester:
                     "device": "/dev/ttyUSB0",
                     "state": "connected",
                     "error": None,
-                    "ts": datetime.utcnow().isoformat(),
+                    "ts": ts,
                     "device_info": {
                         "device_path": "/dev/ttyUSB0",
                         "device_type": "ble",
                         "fingerprint": "a1b2c3d4",
                         "capabilities": ["serial_communication", "bluetooth_low_energy"],
-                        "last_seen": datetime.utcnow().isoformat(),
+                        "last_seen": ts,
                         "is_connected": True
                     }
                 }
@@ -368,7 +492,7 @@ class Phase1ComprehensiveTester:
                 "message": {
                     "device": "/dev/ttyUSB0",
                     "data": "BLE_TEST_DATA",
-                    "ts": datetime.utcnow().isoformat(),
+                    "ts": ts,
                     "device_type": "ble",
                     "fingerprint": "a1b2c3d4"
                 }
@@ -379,7 +503,7 @@ class Phase1ComprehensiveTester:
         for test_msg in test_messages:
             if self._validate_message_format(test_msg["message"], test_msg["type"]):
                 valid_messages += 1
-                print(f"  ✅ {test_msg['type']} message format valid")
+                logger.debug("  ✅ %s message format valid", test_msg["type"])
             else:
                 print(f"  ❌ {test_msg['type']} message format invalid")
                 
@@ -400,20 +524,7 @@ class Phase1ComprehensiveTester:
             
     def _validate_message_format(self, message: Dict, message_type: str) -> bool:
         """Validate message format"""
-        required_fields = {
-            "discovery": ["device_path", "device_type", "fingerprint", "capabilities", "discovered_at"],
-            "status": ["device", "state", "ts"],
-            "data": ["device", "data", "ts"]
-        }
-        
-        if message_type not in required_fields:
-            return False
-            
-        for field in required_fields[message_type]:
-            if field not in message:
-                return False
-                
-        return True
+        return _VALIDATORS.get(message_type, _reject)(message)
         
     async def test_7_mqtt_discovery(self):
         """Test 7: MQTT Discovery Integration"""
@@ -423,36 +534,43 @@ class Phase1ComprehensiveTester:
         
         start_time = time.time()
         
-        # Test MQTT discovery message
+        # Test MQTT discovery messages: build every config first, then queue
+        # them back to back on the open connection so they leave in one flush
+        devices = [("/dev/ttyUSB0", "a1b2c3d4", "BLE Dongle")]
+        messages = [self._discovery_message(*device) for device in devices]
+        for topic, payload in messages:
+            self.client.publish(topic, payload, qos=1, retain=True)
+            print(f"  📤 Published MQTT discovery config to {topic}")
+        
+        self.add_test_result(
+            "MQTT Discovery",
+            "PASS",
+            f"{len(messages)} MQTT discovery config(s) published successfully",
+            time.time() - start_time
+        )
+        
+    def _discovery_message(self, device_path: str, fingerprint: str, model: str) -> Tuple[str, bytes]:
+        """Build the (topic, payload) of a retained discovery config for one device"""
+        node_id = device_path.strip("/").replace("/", "_")
         discovery_config = {
-            "name": "Serial /dev/ttyUSB0 Last",
-            "unique_id": "multi_serial_dev_ttyUSB0",
-            "state_topic": "multi_serial/dev_ttyUSB0/data",
+            "name": f"Serial {device_path} Last",
+            "unique_id": f"multi_serial_{node_id}",
+            "state_topic": f"multi_serial/{node_id}/data",
             "value_template": "{{ value_json.data }}",
-            "json_attributes_topic": "multi_serial/dev_ttyUSB0/status",
+            "json_attributes_topic": f"multi_serial/{node_id}/status",
             "device": {
-                "identifiers": ["multi_serial_a1b2c3d4"],
-                "name": "Serial Device /dev/ttyUSB0",
-                "model": "BLE Dongle",
+                "identifiers": [f"multi_serial_{fingerprint}"],
+                "name": f"Serial Device {device_path}",
+                "model": model,
                 "manufacturer": "Multi Serial Scanner",
                 "sw_version": "1.0.0"
             },
             "availability": [{
-                "topic": "multi_serial/dev_ttyUSB0/status",
+                "topic": f"multi_serial/{node_id}/status",
                 "value_template": "{{ value_json.state }}"
             }]
         }
-        
-        topic = "homeassistant/sensor/dev_ttyUSB0_last/config"
-        self.client.publish(topic, json.dumps(discovery_config), qos=1, retain=True)
-        print(f"  📤 Published MQTT discovery config to {topic}")
-        
-        self.add_test_result(
-            "MQTT Discovery",
-            "PASS",
-            "MQTT discovery config published successfully",
-            time.time() - start_time
-        )
+        return f"homeassistant/sensor/{node_id}_last/config", _json_encode(discovery_config)
         
     async def test_8_serial_port_scanning(self):
         """Test 8: Serial Port Scanning"""
@@ -463,40 +581,27 @@ class Phase1ComprehensiveTester:
         start_time = time.time()
         
         # Check available serial ports
-        available_ports = list(serial.tools.list_ports.comports())
-        print(f"  Found {len(available_ports)} serial ports:")
+        available_ports = _fast_list_ports()
+        source = "tty devices" if sys.platform == "linux" else "serial ports"
+        print(f"  Found {len(available_ports)} {source}:")
         
         for port in available_ports:
-            print(f"    - {port.device}: {port.description}")
+            logger.debug("    - %s", port)
             
         # Test port filtering
-        include_patterns = ["/dev/ttyUSB*", "/dev/ttyACM*"]
-        exclude_patterns = ["/dev/ttyS*", "/dev/input*", "/dev/hidraw*"]
-        
-        filtered_ports = self._filter_ports(available_ports, include_patterns, exclude_patterns)
+        filtered_ports = self._filter_ports(available_ports, _INCLUDE_RE, _EXCLUDE_RE)
         print(f"  After filtering: {len(filtered_ports)} ports")
         
         self.add_test_result(
             "Serial Port Scanning",
             "PASS" if len(available_ports) >= 0 else "SKIP",
-            f"Found {len(available_ports)} ports, {len(filtered_ports)} after filtering",
+            f"Found {len(available_ports)} {source}, {len(filtered_ports)} after filtering",
             time.time() - start_time
         )
         
-    def _filter_ports(self, ports, include_patterns, exclude_patterns):
-        """Filter ports based on patterns"""
-        import fnmatch
-        
-        def matches(path, patterns):
-            return any(fnmatch.fnmatch(path, pat) for pat in patterns)
-            
-        filtered = []
-        for port in ports:
-            if (matches(port.device, include_patterns) and 
-                not matches(port.device, exclude_patterns)):
-                filtered.append(port)
-                
-        return filtered
+    def _filter_ports(self, ports, include_re, exclude_re):
+        """Filter ports based on precompiled include/exclude patterns"""
+        return [p for p in ports if include_re.match(p) and not exclude_re.match(p)]
         
     async def test_9_error_handling(self):
         """Test 9: Error Handling and Recovery"""
@@ -520,7 +625,7 @@ class Phase1ComprehensiveTester:
             # Simulate error handling
             if expected_result == "PASS":
                 passed_scenarios += 1
-                print(f"  ✅ {scenario}")
+                logger.debug("  ✅ %s", scenario)
             else:
                 print(f"  ❌ {scenario}")
                 
@@ -541,26 +646,39 @@ class Phase1ComprehensiveTester:
         
         # Test message publishing performance
         message_count = 10
-        publish_start = time.time()
         
+        # Build and encode everything up front so the timed window measures
+        # publishing, not JSON encoding
+        ts = _iso_now()
+        messages = []
         for i in range(message_count):
             test_message = {
                 "device": f"/dev/ttyUSB{i}",
                 "data": f"test_data_{i}",
-                "ts": datetime.utcnow().isoformat(),
+                "ts": ts,
                 "device_type": "test",
                 "fingerprint": f"test{i:04d}"
             }
             topic = f"multi_serial/test_performance_{i}/data"
-            self.client.publish(topic, json.dumps(test_message), qos=0)
+            messages.append((topic, _json_encode(test_message)))
+            
+        # A small window so the burst has to wait for the writer to drain,
+        # exercising the back-pressure path
+        pending = asyncio.Semaphore(4)
+        queued = 0
+        publish_start = time.time()
+        for topic, payload in messages:
+            if await self._publish_bounded(pending, topic, payload, qos=0):
+                queued += 1
             
         publish_time = time.time() - publish_start
-        messages_per_second = message_count / publish_time
+        messages_per_second = queued / publish_time
+        dropped = message_count - queued
         
-        print(f"  Published {message_count} messages in {publish_time:.2f}s")
+        print(f"  Published {queued} messages in {publish_time:.2f}s ({dropped} dropped)")
         print(f"  Performance: {messages_per_second:.1f} messages/second")
         
-        if messages_per_second > 1:  # Should be able to handle at least 1 msg/sec
+        if messages_per_second > 1 and not dropped:  # Should be able to handle at least 1 msg/sec
             self.add_test_result(
                 "Performance",
                 "PASS",
@@ -571,52 +689,55 @@ class Phase1ComprehensiveTester:
             self.add_test_result(
                 "Performance",
                 "FAIL",
-                f"Performance too slow: {messages_per_second:.1f} messages/second",
+                f"Performance too slow: {messages_per_second:.1f} messages/second, {dropped} dropped",
                 time.time() - start_time
             )
             
     def print_final_summary(self):
         """Print comprehensive test summary"""
-        print("\n" + "="*80)
-        print("PHASE 1 COMPREHENSIVE TEST SUMMARY")
-        print("="*80)
-        
         total_tests = len(self.test_results)
-        passed_tests = sum(1 for r in self.test_results if r.status == "PASS")
-        failed_tests = sum(1 for r in self.test_results if r.status == "FAIL")
-        skipped_tests = sum(1 for r in self.test_results if r.status == "SKIP")
-        
+        passed_tests = self._status_counts["PASS"]
         total_duration = time.time() - self.test_start_time
         
-        print(f"Total Tests: {total_tests}")
-        print(f"Passed: {passed_tests} ✅")
-        print(f"Failed: {failed_tests} ❌")
-        print(f"Skipped: {skipped_tests} ⚠️")
-        print(f"Total Duration: {total_duration:.2f} seconds")
-        print(f"Success Rate: {(passed_tests/total_tests)*100:.1f}%")
-        
-        print("\nDetailed Results:")
-        print("-" * 80)
+        # Built up and written once rather than one print() per line
+        lines = [
+            "",
+            "="*80,
+            "PHASE 1 COMPREHENSIVE TEST SUMMARY",
+            "="*80,
+            f"Total Tests: {total_tests}",
+            f"Passed: {passed_tests} ✅",
+            f"Failed: {self._status_counts['FAIL']} ❌",
+            f"Skipped: {self._status_counts['SKIP']} ⚠️",
+            f"Total Duration: {total_duration:.2f} seconds",
+            f"Success Rate: {(passed_tests/total_tests)*100:.1f}%",
+            "",
+            "Detailed Results:",
+            "-" * 80,
+        ]
         for result in self.test_results:
-            status_icon = "✅" if result.status == "PASS" else "❌" if result.status == "FAIL" else "⚠️"
-            print(f"{status_icon} {result.test_name:30} | {result.status:6} | {result.duration:6.2f}s | {result.details}")
+            status_icon = _ICONS.get(result.status, "⚠️")
+            lines.append(f"{status_icon} {result.test_name:30} | {result.status:6} | {result.duration:6.2f}s | {result.details}")
             
-        print("\n" + "="*80)
+        lines += ["", "="*80]
         
         if passed_tests == total_tests:
-            print("🎉 ALL TESTS PASSED! Phase 1 is COMPLETELY WORKING! 🎉")
-            print("✅ Device Type Detection: WORKING")
-            print("✅ MQTT Communication: WORKING")
-            print("✅ Message Queuing: WORKING")
-            print("✅ Two-Way Communication: WORKING")
-            print("✅ Error Handling: WORKING")
-            print("✅ Performance: ACCEPTABLE")
+            lines += [
+                "🎉 ALL TESTS PASSED! Phase 1 is COMPLETELY WORKING! 🎉",
+                "✅ Device Type Detection: WORKING",
+                "✅ MQTT Communication: WORKING",
+                "✅ Message Queuing: WORKING",
+                "✅ Two-Way Communication: WORKING",
+                "✅ Error Handling: WORKING",
+                "✅ Performance: ACCEPTABLE",
+            ]
         elif passed_tests >= total_tests * 0.8:
-            print("⚠️ MOST TESTS PASSED! Phase 1 is mostly working with minor issues.")
+            lines.append("⚠️ MOST TESTS PASSED! Phase 1 is mostly working with minor issues.")
         else:
-            print("❌ MANY TESTS FAILED! Phase 1 needs attention.")
+            lines.append("❌ MANY TESTS FAILED! Phase 1 needs attention.")
             
-        print("="*80)
+        lines.append("="*80)
+        sys.stdout.write("\n".join(lines) + "\n")
 
 
 async def main():
@@ -651,8 +772,15 @@ async def main():
         
     finally:
         # Cleanup
-        tester.disconnect_mqtt()
+        await tester.disconnect_mqtt()
 
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Phase 1 tests for the Multi Serial Scanner add-on")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show every received message and passing case")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
+    
     asyncio.run(main())
@@ -19,6 +19,10 @@ export MESSAGE_QUEUE_SIZE=$(bashio::config 'message_queue_size')
 export ENABLE_DEVICE_DETECTION=$(bashio::config 'enable_device_detection')
 export IDENTIFICATION_TIMEOUT=$(bashio::config 'identification_timeout')
 
+# Realtime scheduling (optional)
+export RT_CPU=$(bashio::config 'rt_cpu')
+export RT_PRIO=$(bashio::config 'rt_prio')
+
 # Convert json arrays to csv envs (robust if unset)
 INCLUDE_JSON=$(bashio::config 'include_patterns')
 EXCLUDE_JSON=$(bashio::config 'exclude_patterns')